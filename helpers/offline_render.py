@@ -0,0 +1,164 @@
+import json
+import os
+import time
+import wave
+
+import numpy as np
+
+from helpers.smoothing import BarSmoother, levels_to_rows
+from helpers.soundbars import bar_lines
+from helpers.spectrum import MIN_FRAME_SIZE, SpectrumAnalyzer
+
+# Move the cursor home, so each frame overwrites the previous one
+CURSOR_HOME = "\x1b[H"
+CLEAR_SCREEN = "\x1b[2J"
+
+
+def decode_samples(data, sample_width, channels):
+    """
+    Convert raw PCM bytes from a WAV file into mono float samples in [-1, 1].
+
+    Args:
+        data: Raw frames as returned by wave.Wave_read.readframes()
+        sample_width: Bytes per sample (1, 2, 3 or 4)
+        channels: Number of interleaved channels
+    """
+    if sample_width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        values = raw[:, 0] | (raw[:, 1] << 8) | (raw[:, 2] << 16)
+        values = np.where(values & 0x800000, values - 0x1000000, values)
+        samples = values.astype(np.float32) / 8388608.0
+    elif sample_width == 4:
+        samples = np.frombuffer(data, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+def read_wav_blocks(wav, fps):
+    """
+    Yield one block of mono samples per video frame from an open WAV file.
+
+    Block boundaries are computed from the frame index, so the video stays in
+    sync with the audio even when the sample rate is not a multiple of fps.
+    Only one block is held in memory at a time.
+    """
+    sample_rate = wav.getframerate()
+    sample_width = wav.getsampwidth()
+    channels = wav.getnchannels()
+    total = wav.getnframes()
+
+    frame = 0
+    start = 0
+    while start < total:
+        end = min(total, (frame + 1) * sample_rate // fps)
+        data = wav.readframes(end - start)
+        if not data:
+            break
+        yield decode_samples(data, sample_width, channels)
+        frame += 1
+        start = end
+
+class AsciicastWriter:
+    """Write an asciicast v2 recording one event at a time."""
+
+    def __init__(self, stream, width, height, title=None, timestamp=None):
+        """
+        Args:
+            stream: Text file to write to
+            width: Terminal width of the recording in columns
+            height: Terminal height of the recording in rows
+            title: Optional title stored in the header
+            timestamp: Optional Unix time stored in the header. Left out by
+                default, so the same input always gives the same file.
+        """
+        self.stream = stream
+        header = {
+            "version": 2,
+            "width": width,
+            "height": height,
+            "env": {"TERM": "xterm-256color"},
+        }
+        if timestamp is not None:
+            header["timestamp"] = int(timestamp)
+        if title:
+            header["title"] = title
+        stream.write(json.dumps(header) + "\n")
+
+    def output(self, seconds, text):
+        """Record text written to the terminal at the given time."""
+        self.stream.write(json.dumps([round(seconds, 6), "o", text]) + "\n")
+
+def render_wav_to_asciicast(wav_path, output_path, fps=30, num_bars=32, max_height=16, width=2):
+    """
+    Render the sound bars for a WAV file into an asciicast v2 recording.
+
+    No device or terminal is needed. Input and output are streamed, so memory
+    use does not depend on the length of the file.
+
+    Args:
+        wav_path: Path of the WAV file to render
+        output_path: Path of the .cast file to write
+        fps: Frames per second of the recording
+        num_bars: Number of bars to draw
+        max_height: Height of the bars in rows
+        width: Width of a single bar in characters
+
+    Returns:
+        Dictionary with the number of frames, the audio duration, the time
+        taken and the render throughput in frames per second
+
+    Raises:
+        ValueError: If fps is not positive or leaves fewer than MIN_FRAME_SIZE
+            samples per frame, or the bar count or height is not positive
+    """
+    started = time.perf_counter()
+    frames = 0
+
+    with wave.open(wav_path, "rb") as wav:
+        sample_rate = wav.getframerate()
+        max_fps = sample_rate // MIN_FRAME_SIZE
+        if not 0 < fps <= max_fps:
+            raise ValueError(f"fps must be between 1 and {max_fps} for a {sample_rate} Hz file, got {fps}")
+        if num_bars <= 0 or max_height <= 0:
+            raise ValueError("num_bars and max_height must be positive")
+        duration = wav.getnframes() / sample_rate
+
+        with open(output_path, "w", encoding="utf-8") as output:
+            analyzer = SpectrumAnalyzer(sample_rate, sample_rate // fps, num_bars, max_height)
+            smoother = BarSmoother(num_bars)
+
+            # Title line, the bars and the base line
+            writer = AsciicastWriter(
+                output,
+                num_bars * width,
+                max_height + 2,
+                title=os.path.basename(wav_path)
+            )
+            title = f"Music Visualization - {os.path.basename(wav_path)}"[:num_bars * width]
+
+            for samples in read_wav_blocks(wav, fps):
+                smoother.update(analyzer.analyze(samples))
+                lines = bar_lines(
+                    levels_to_rows(smoother.levels, max_height),
+                    width=width,
+                    peaks=levels_to_rows(smoother.peaks, max_height),
+                    max_height=max_height
+                )
+                prefix = CLEAR_SCREEN + CURSOR_HOME if frames == 0 else CURSOR_HOME
+                writer.output(frames / fps, prefix + "\r\n".join([title] + lines))
+                frames += 1
+
+    elapsed = time.perf_counter() - started
+    return {
+        "frames": frames,
+        "duration_s": duration,
+        "elapsed_s": elapsed,
+        "frames_per_second": frames / elapsed if elapsed > 0 else float("inf"),
+    }
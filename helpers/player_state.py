@@ -0,0 +1,141 @@
+import threading
+import time
+from collections import deque
+
+
+class PlayerState:
+    """
+    Local, optimistic copy of the device's playback state.
+
+    Key presses change it immediately so the UI can show the result before
+    the device has acted on the command. Readings from the device reconcile
+    it later, but only when nothing changed locally in the meantime.
+    """
+
+    def __init__(self, playing=False, volume=None, max_volume=None):
+        self.playing = playing
+        self.volume = volume
+        self.max_volume = max_volume
+        # Bumped on every local change, so stale device readings are dropped
+        self.generation = 0
+        self._lock = threading.Lock()
+
+    def toggle_playing(self):
+        """Flip the play/pause state and return the new value."""
+        with self._lock:
+            self.playing = not self.playing
+            self.generation += 1
+            return self.playing
+
+    def change_volume(self, step):
+        """
+        Move the volume by step levels, clamped to the valid range.
+
+        Returns:
+            The new target volume, or None if the volume is unknown
+        """
+        with self._lock:
+            if self.volume is None:
+                return None
+            self.volume = max(0, min(self.max_volume, self.volume + step))
+            self.generation += 1
+            return self.volume
+
+    def reconcile(self, generation, playing, volume=None):
+        """
+        Apply state read from the device.
+
+        Args:
+            generation: Value of self.generation taken before the read started
+            playing: Whether the device reported it is playing
+            volume: Tuple of (volume, max_volume) or None if it was not read
+
+        Returns:
+            True if the reading was applied, False if it was stale
+        """
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self.playing = playing
+            if volume is not None:
+                self.volume, self.max_volume = volume
+            return True
+
+
+class CommandWorker:
+    """
+    Run ADB commands on a background thread, in the order they were submitted.
+
+    Commands submitted with the same key replace each other while still
+    queued, so a burst of volume presses sends only the final level. When the
+    queue has been idle for idle_interval seconds, on_idle is called, which
+    is where the device state is read back.
+    """
+
+    def __init__(self, on_idle=None, idle_interval=2.0):
+        self.on_idle = on_idle
+        self.idle_interval = idle_interval
+        self._queue = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        """Start the worker thread."""
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def close(self, timeout=1.0):
+        """Stop the worker thread, waiting up to timeout for queued commands to finish."""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, func, *args, key=None):
+        """
+        Queue func(*args). If the worker is not running, run it right away.
+
+        Args:
+            func: Command to run
+            *args: Arguments for the command
+            key: Optional key; a queued command with the same key is replaced
+        """
+        with self._condition:
+            if self._running:
+                if key is not None:
+                    for i, (queued_key, _, _) in enumerate(self._queue):
+                        if queued_key == key:
+                            self._queue[i] = (key, func, args)
+                            return
+                self._queue.append((key, func, args))
+                self._condition.notify()
+                return
+        func(*args)
+
+    def _run(self):
+        last_activity = time.monotonic()
+        while True:
+            with self._condition:
+                if not self._queue and self._running:
+                    self._condition.wait(max(0.0, last_activity + self.idle_interval - time.monotonic()))
+                if self._queue:
+                    command = self._queue.popleft()
+                elif not self._running:
+                    return
+                else:
+                    command = None
+
+            try:
+                if command is not None:
+                    _, func, args = command
+                    func(*args)
+                    last_activity = time.monotonic()
+                elif self.on_idle is not None and time.monotonic() - last_activity >= self.idle_interval:
+                    self.on_idle()
+                    last_activity = time.monotonic()
+            except Exception as e:
+                print(f"Error running ADB command: {e}")
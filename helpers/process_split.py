@@ -0,0 +1,180 @@
+import multiprocessing
+import queue
+import signal
+import time
+
+import numpy as np
+
+from utils import adb
+from helpers.player_state import CommandWorker
+from helpers.shared_frame import SharedFrame
+from helpers.smoothing import BarSmoother
+
+
+def device_worker(device_id, frame_name, max_bars, commands, stop):
+    """
+    Worker process that runs ADB commands and reads the device state back.
+
+    Commands arrive on the commands queue as (func, args, key, generation).
+    The device state is published to the track section of the shared frame,
+    tagged with the generation of the last command seen before the read.
+
+    Args:
+        device_id: The ID of the connected Android device
+        frame_name: Name of the SharedFrame block to attach to
+        max_bars: Size the SharedFrame block was created with
+        commands: Queue of commands from the renderer
+        stop: Event set by the renderer to shut the worker down
+    """
+    # Ctrl-C reaches the whole process group; the renderer stops us through stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    frame = SharedFrame(max_bars, name=frame_name)
+    generation = 0
+
+    def publish_state():
+        seen = generation
+        playing = adb.get_current_track_info(device_id).get("playing", False)
+        volume = adb.get_music_volume(device_id)
+        volume, max_volume = volume if volume is not None else (-1, -1)
+        frame.track.write([float(playing), volume, max_volume, seen])
+
+    worker = CommandWorker(on_idle=publish_state)
+    publish_state()
+    worker.start()
+    try:
+        while not stop.is_set():
+            try:
+                func, args, key, generation = commands.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            worker.submit(func, *args, key=key)
+    finally:
+        worker.close()
+        frame.close()
+
+def analysis_worker(frame_name, max_bars, update_interval, stop):
+    """
+    Worker process that produces the smoothed bar heights.
+
+    It follows the bar count, height and play state the renderer publishes in
+    the view section and writes one frame of bars per update_interval.
+
+    Args:
+        frame_name: Name of the SharedFrame block to attach to
+        max_bars: Size the SharedFrame block was created with
+        update_interval: Seconds between frames
+        stop: Event set by the renderer to shut the worker down
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    frame = SharedFrame(max_bars, name=frame_name)
+    smoother = BarSmoother(0)
+    view = np.zeros(SharedFrame.VIEW_SIZE)
+    bars = np.zeros(frame.bars_size)
+    next_frame = time.monotonic()
+    try:
+        while not stop.is_set():
+            frame.view.read(view)
+            num_bars, max_height, playing = int(view[0]), int(view[1]), bool(view[2])
+
+            if num_bars:
+                # Random heights stand in for a real audio analysis
+                if playing:
+                    targets = np.random.randint(1, max_height + 1, num_bars)
+                else:
+                    targets = np.random.randint(1, 4, num_bars)
+                smoother.update(targets)
+
+                bars[0] = num_bars
+                bars[1:1 + num_bars] = smoother.levels
+                bars[1 + max_bars:1 + max_bars + num_bars] = smoother.peaks
+                frame.bars.write(bars)
+
+            next_frame += update_interval
+            stop.wait(max(0.0, next_frame - time.monotonic()))
+    finally:
+        frame.close()
+
+
+class ProcessSplit:
+    """
+    Renderer-side handle for the device and analysis worker processes.
+
+    It offers the same submit() as CommandWorker, so key handling does not
+    care which mode is in use. The renderer reads the latest bars and device
+    state from shared memory and never waits on the workers.
+    """
+
+    def __init__(self, device_id, player, max_bars, update_interval):
+        self.device_id = device_id
+        self.player = player
+        self.max_bars = max_bars
+        self.update_interval = update_interval
+        self.frame = None
+        self._processes = []
+        self._track = np.zeros(SharedFrame.TRACK_SIZE)
+        self._track_sequence = 0
+        self._bars = None
+
+    def start(self):
+        """Create the shared frame and start the worker processes."""
+        self.frame = SharedFrame(self.max_bars)
+        self._bars = np.zeros(self.frame.bars_size)
+        self._commands = multiprocessing.Queue()
+        self._stop = multiprocessing.Event()
+        self._processes = [
+            multiprocessing.Process(
+                target=device_worker,
+                args=(self.device_id, self.frame.name, self.max_bars, self._commands, self._stop),
+                daemon=True
+            ),
+            multiprocessing.Process(
+                target=analysis_worker,
+                args=(self.frame.name, self.max_bars, self.update_interval, self._stop),
+                daemon=True
+            ),
+        ]
+        for process in self._processes:
+            process.start()
+
+    def close(self, timeout=1.0):
+        """Stop the worker processes and free the shared frame."""
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        self._commands.close()
+        self.frame.close()
+
+    def submit(self, func, *args, key=None):
+        """Send a command to the device worker. See CommandWorker.submit()."""
+        self._commands.put((func, args, key, self.player.generation))
+
+    def publish_view(self, num_bars, max_height):
+        """Tell the analysis worker what to produce for the next frames."""
+        self.frame.view.write([num_bars, max_height, float(self.player.playing)])
+
+    def sync_player(self):
+        """Reconcile the local player state with the latest device reading."""
+        sequence = self.frame.track.read(self._track)
+        if sequence and sequence != self._track_sequence:
+            self._track_sequence = sequence
+            playing, volume, max_volume, generation = self._track
+            self.player.reconcile(
+                int(generation),
+                bool(playing),
+                (int(volume), int(max_volume)) if volume >= 0 else None
+            )
+
+    def read_bars(self):
+        """
+        Read the latest bars published by the analysis worker.
+
+        Returns:
+            Tuple of (levels, peaks), views into a buffer reused by the next read.
+            If no consistent snapshot could be read, the previous bars are returned.
+        """
+        self.frame.bars.read(self._bars)
+        num_bars = int(self._bars[0])
+        return self._bars[1:1 + num_bars], self._bars[1 + self.max_bars:1 + self.max_bars + num_bars]
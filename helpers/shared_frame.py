@@ -0,0 +1,113 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SeqlockSection:
+    """
+    A fixed-size float64 array in shared memory guarded by a seqlock.
+
+    A single writer bumps the sequence counter to an odd value, writes the
+    values and bumps it to the next even value. Readers never block the
+    writer: they copy the values and retry if the counter was odd or moved
+    while they were copying.
+    """
+
+    # Reads give up after this many attempts, so a writer that died halfway
+    # through a write cannot make a reader spin forever
+    MAX_READ_ATTEMPTS = 100
+
+    def __init__(self, buffer, offset, size):
+        self._sequence = np.ndarray((1,), dtype=np.int64, buffer=buffer, offset=offset)
+        self._values = np.ndarray((size,), dtype=np.float64, buffer=buffer, offset=offset + 8)
+        self._scratch = np.zeros(size)
+
+    @staticmethod
+    def nbytes(size):
+        """Bytes needed for a section holding size values."""
+        return 8 + 8 * size
+
+    @property
+    def sequence(self):
+        return int(self._sequence[0])
+
+    def write(self, values):
+        """Publish new values. Only one process may write a section."""
+        sequence = self._sequence[0]
+        self._sequence[0] = sequence + 1
+        self._values[:len(values)] = values
+        self._sequence[0] = sequence + 2
+
+    def read(self, out):
+        """
+        Copy a consistent snapshot of the values into out.
+
+        Args:
+            out: float64 array of the section size, reused between reads
+
+        Returns:
+            The sequence number of the snapshot, 0 if nothing was written yet.
+            None if no consistent snapshot could be taken; out then keeps the
+            previous snapshot.
+        """
+        for _ in range(self.MAX_READ_ATTEMPTS):
+            before = self._sequence[0]
+            if before & 1:
+                continue
+            np.copyto(self._scratch, self._values)
+            if self._sequence[0] == before:
+                np.copyto(out, self._scratch)
+                return int(before)
+        return None
+
+
+class SharedFrame:
+    """
+    Shared memory block exchanged between the renderer and the worker processes.
+
+    It holds three sections, each with a single writer:
+
+    - view: [num_bars, max_height, playing], written by the renderer
+    - track: [playing, volume, max_volume, generation], written by the device worker
+    - bars: [num_bars, heights..., peaks...], written by the analysis worker
+    """
+
+    VIEW_SIZE = 3
+    TRACK_SIZE = 4
+
+    def __init__(self, max_bars, name=None):
+        """
+        Args:
+            max_bars: Largest number of bars the block can hold
+            name: Name of an existing block to attach to, or None to create one
+        """
+        self.max_bars = max_bars
+        self.bars_size = 1 + 2 * max_bars
+        sizes = [self.VIEW_SIZE, self.TRACK_SIZE, self.bars_size]
+
+        self._owner = name is None
+        if self._owner:
+            total = sum(SeqlockSection.nbytes(size) for size in sizes)
+            self._shm = shared_memory.SharedMemory(create=True, size=total)
+            self._shm.buf[:total] = bytes(total)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        offset = 0
+        sections = []
+        for size in sizes:
+            sections.append(SeqlockSection(self._shm.buf, offset, size))
+            offset += SeqlockSection.nbytes(size)
+        self.view, self.track, self.bars = sections
+
+    @property
+    def name(self):
+        return self._shm.name
+
+    def close(self):
+        """Detach from the block, and free it if this process created it."""
+        # The numpy views must go before the buffer can be released
+        self.view = self.track = self.bars = None
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,116 @@
+import numpy as np
+
+
+def levels_to_rows(levels, max_height):
+    """Round bar levels to whole rows, clipped to max_height."""
+    return np.clip(np.rint(levels), 0, max_height).astype(int)
+
+
+class BarSmoother:
+    """
+    Smooth sound bar heights across frames with attack/decay and peak-hold.
+
+    Rising bars move towards their target at the attack rate, falling bars at
+    the decay rate. Each bar also keeps a peak marker that holds for a few
+    frames before falling back towards the bar.
+    """
+
+    def __init__(self, num_bars, attack=0.7, decay=0.25, hold_frames=6, peak_fall=0.5):
+        """
+        Args:
+            num_bars: Number of bars to smooth
+            attack: Fraction of the gap closed per frame when a bar rises
+            decay: Fraction of the gap closed per frame when a bar falls
+            hold_frames: Frames a peak marker stays put before falling
+            peak_fall: Rows a peak marker drops per frame once released
+        """
+        self.attack = attack
+        self.decay = decay
+        self.hold_frames = hold_frames
+        self.peak_fall = peak_fall
+        self.levels = np.zeros(num_bars, dtype=np.float32)
+        self.peaks = np.zeros(num_bars, dtype=np.float32)
+        self._hold = np.zeros(num_bars, dtype=np.int32)
+
+    @property
+    def num_bars(self):
+        return self.levels.size
+
+    def resize(self, num_bars):
+        """Change the number of bars, resampling the current state to fit."""
+        if num_bars == self.num_bars:
+            return
+        if self.num_bars == 0:
+            self.levels = np.zeros(num_bars, dtype=np.float32)
+            self.peaks = np.zeros(num_bars, dtype=np.float32)
+        else:
+            old = np.linspace(0.0, 1.0, self.num_bars)
+            new = np.linspace(0.0, 1.0, num_bars)
+            self.levels = np.interp(new, old, self.levels).astype(np.float32)
+            self.peaks = np.interp(new, old, self.peaks).astype(np.float32)
+        self._hold = np.zeros(num_bars, dtype=np.int32)
+
+    def update(self, targets):
+        """
+        Advance the smoothing by one frame.
+
+        Args:
+            targets: Raw bar heights for this frame
+
+        Returns:
+            The smoothed bar levels as a float array
+        """
+        targets = np.asarray(targets, dtype=np.float32)
+        self.resize(targets.size)
+
+        rate = np.where(targets > self.levels, self.attack, self.decay)
+        self.levels += rate * (targets - self.levels)
+
+        rising = self.levels >= self.peaks
+        self.peaks[rising] = self.levels[rising]
+        self._hold[rising] = self.hold_frames
+        self._hold[~rising] -= 1
+        falling = ~rising & (self._hold < 0)
+        self.peaks[falling] -= self.peak_fall
+        np.maximum(self.peaks, self.levels, out=self.peaks)
+        np.maximum(self._hold, -1, out=self._hold)
+
+        return self.levels
+
+
+class SpectrogramHistory:
+    """
+    Fixed-size ring buffer of past bar levels for the scrolling spectrogram.
+
+    The buffer is only reallocated when the terminal size changes, so memory
+    use stays constant no matter how long the session runs.
+    """
+
+    def __init__(self, rows, num_bars):
+        self._buffer = np.zeros((rows, num_bars), dtype=np.float32)
+        self._next = 0
+
+    @property
+    def shape(self):
+        return self._buffer.shape
+
+    def resize(self, rows, num_bars):
+        """Reallocate the buffer for a new size, dropping the old history."""
+        if (rows, num_bars) != self._buffer.shape:
+            self._buffer = np.zeros((rows, num_bars), dtype=np.float32)
+            self._next = 0
+
+    def push(self, levels):
+        """Store one frame of bar levels, overwriting the oldest one."""
+        rows = self._buffer.shape[0]
+        if rows == 0:
+            return
+        self.resize(rows, len(levels))
+        self._buffer[self._next] = levels
+        self._next = (self._next + 1) % rows
+
+    def frames(self):
+        """Return the stored frames ordered newest first."""
+        rows = self._buffer.shape[0]
+        order = (self._next - 1 - np.arange(rows)) % rows
+        return self._buffer[order]
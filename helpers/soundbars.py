@@ -2,7 +2,9 @@ import os
 import sys
 import time
 import random
+import shutil
 import keyboard
+import numpy as np
 from colorama import init, Fore, Style
 from utils.adb import (
     play_pause,
@@ -10,8 +12,15 @@ from utils.adb import (
     previous_track,
     volume_up,
     volume_down,
-    get_current_track_info
+    get_current_track_info,
+    get_music_volume,
+    set_music_volume
 )
+from utils.latency import LatencyRecorder, format_summary
+from helpers.player_state import PlayerState, CommandWorker
+from helpers.process_split import ProcessSplit
+from helpers.smoothing import BarSmoother, SpectrogramHistory, levels_to_rows
+from helpers.terminal_input import TerminalInput
 
 # Initialize colorama
 init()
@@ -26,6 +35,15 @@ COLORS = [
     Fore.CYAN,
 ]
 
+# Shades used by the spectrogram view, from silent to loudest
+SPECTROGRAM_SHADES = " ░▒▓█"
+
+# Rows used by the header and controls around the bars
+HEADER_ROWS = 5
+CONTROLS_ROWS = 5
+MAX_BARS = 64
+MIN_BAR_HEIGHT = 3
+
 def clear_screen():
     """Clear the terminal screen."""
     os.system('cls' if os.name == 'nt' else 'clear')
@@ -34,26 +52,94 @@ def generate_random_bars(num_bars=10, max_height=10):
     """Generate random heights for sound bars."""
     return [random.randint(1, max_height) for _ in range(num_bars)]
 
-def draw_bars(heights, width=3):
-    """Draw ASCII sound bars with the given heights."""
-    max_height = max(heights)
+def compute_layout(width=3, show_spectrogram=False):
+    """
+    Work out how many bars fit in the terminal and how tall they can be.
+
+    Args:
+        width: Width of a single bar in characters
+        show_spectrogram: Whether rows must be left for the spectrogram view
+
+    Returns:
+        Tuple of (num_bars, max_height, spectrogram_rows)
+    """
+    columns, rows = shutil.get_terminal_size()
+    num_bars = max(1, min(MAX_BARS, (columns - 1) // width))
+
+    # Leave room for the header, the base line and the controls
+    available = max(MIN_BAR_HEIGHT, rows - HEADER_ROWS - CONTROLS_ROWS - 2)
+    spectrogram_rows = 0
+    if show_spectrogram:
+        # One line goes to the spectrogram title
+        spectrogram_rows = max(0, available // 3 - 1)
+        available = max(MIN_BAR_HEIGHT, available - spectrogram_rows - 1)
+
+    return num_bars, available, spectrogram_rows
+
+def bar_lines(heights, width=3, peaks=None, max_height=None):
+    """
+    Build the lines of the ASCII sound bars, top to bottom, base line last.
 
-    # Draw bars from top to bottom
+    Args:
+        heights: Height of each bar in rows
+        width: Width of a single bar in characters
+        peaks: Optional peak-hold row for each bar, drawn as a marker
+        max_height: Fixed number of rows to draw, so the frame size is stable
+    """
+    if max_height is None:
+        max_height = max(heights)
+        if peaks is not None:
+            max_height = max(max_height, max(peaks))
+
+    lines = []
     for h in range(max_height, 0, -1):
         line = ""
         for i, height in enumerate(heights):
             color = COLORS[i % len(COLORS)]
             if height >= h:
                 line += color + "█" * width + Style.RESET_ALL
+            elif peaks is not None and peaks[i] == h:
+                line += color + "▔" * width + Style.RESET_ALL
             else:
                 line += " " * width
-        print(line)
+        lines.append(line)
 
     base = ""
     for i in range(len(heights)):
         color = COLORS[i % len(COLORS)]
         base += color + "▀" * width + Style.RESET_ALL
-    print(base)
+    lines.append(base)
+    return lines
+
+def draw_bars(heights, width=3, peaks=None, max_height=None):
+    """
+    Draw ASCII sound bars with the given heights.
+
+    Args:
+        heights: Height of each bar in rows
+        width: Width of a single bar in characters
+        peaks: Optional peak-hold row for each bar, drawn as a marker
+        max_height: Fixed number of rows to draw, so the frame size is stable
+    """
+    for line in bar_lines(heights, width, peaks, max_height):
+        print(line)
+
+def draw_spectrogram(frames, max_height, width=3):
+    """
+    Draw the scrolling spectrogram, newest frame at the top.
+
+    Args:
+        frames: 2D array of bar levels, one row per frame
+        max_height: Bar height that maps to the brightest shade
+        width: Width of a single bar in characters
+    """
+    print(f"{Fore.CYAN}Spectrogram{Style.RESET_ALL}")
+    if len(frames) == 0:
+        return
+    top = len(SPECTROGRAM_SHADES) - 1
+    shades = np.clip(frames / max(max_height, 1) * top, 0, top).astype(int)
+    for row in shades:
+        print("".join(SPECTROGRAM_SHADES[level] * width for level in row))
 
 def draw_controls():
     """Draw music control buttons."""
@@ -67,68 +153,145 @@ def draw_controls():
           f"{Fore.WHITE}[Q]{Style.RESET_ALL} Quit")
     print("=" * 50)
 
-def visualize_music(device_id):
+def visualize_music(device_id, show_spectrogram=False, input_backend="keyboard", process_split=False):
     """
     Display a music visualization with sound bars and controls.
 
     Args:
         device_id: The ID of the connected Android device
+        show_spectrogram: Show a scrolling spectrogram below the bars
+        input_backend: "keyboard" for the global keyboard hook, or "terminal"
+            to read keys from this terminal in cbreak mode
+        process_split: Run ADB I/O and bar analysis in worker processes that
+            publish their results through shared memory
     """
 
     # Set up variables
     running = True
-    num_bars = 15
-    max_height = 15
     update_interval = 0.1  # seconds
     is_test_environment = False  # Flag to track if we're in a test environment
 
-    # Set up keyboard handlers
-    def on_key_press(e):
+    # Bar count and height follow the terminal size and are recomputed every frame
+    num_bars, max_height, spectrogram_rows = compute_layout(show_spectrogram=show_spectrogram)
+    smoother = BarSmoother(num_bars)
+    history = SpectrogramHistory(spectrogram_rows, num_bars)
+
+    # Key presses update the local state at once; ADB commands and reads of
+    # the device state run on a worker thread so the UI never waits on ADB
+    player = PlayerState()
+
+    def read_device_state():
+        generation = player.generation
+        playing = get_current_track_info(device_id).get("playing", False)
+        player.reconcile(generation, playing, get_music_volume(device_id))
+
+    if process_split:
+        commands = ProcessSplit(device_id, player, MAX_BARS, update_interval)
+    else:
+        commands = CommandWorker(on_idle=read_device_state)
+
+    def change_volume(step, fallback):
+        target = player.change_volume(step)
+        if target is None:
+            # Volume could not be read, fall back to relative key events
+            commands.submit(fallback, device_id)
+        else:
+            commands.submit(set_music_volume, device_id, target, key="volume")
+
+    # Time from a key reaching this process to it being dispatched: the
+    # keyboard event timestamp, or the terminal reader thread's arrival time
+    key_latency = LatencyRecorder()
+    terminal_input = None
+
+    def handle_key(key):
         nonlocal running
-        key = e.name.lower()
 
         if key == 'q':
             running = False
         elif key == 'space':
-            play_pause(device_id)
+            player.toggle_playing()
+            commands.submit(play_pause, device_id)
         elif key == 'right':
-            next_track(device_id)
+            commands.submit(next_track, device_id)
         elif key == 'left':
-            previous_track(device_id)
+            commands.submit(previous_track, device_id)
         elif key == 'up':
-            volume_up(device_id)
+            change_volume(1, volume_up)
         elif key == 'down':
-            volume_down(device_id)
+            change_volume(-1, volume_down)
 
-    # Register keyboard handlers
-    keyboard.on_press(on_key_press)
+    # Set up keyboard handlers
+    def on_key_press(e):
+        if isinstance(e.time, float):
+            key_latency.record(time.time() - e.time)
+        handle_key(e.name.lower())
+
+    # Read the device state once up front, then keep it in sync in the background.
+    # The device worker process does its own first read.
+    if not process_split:
+        read_device_state()
+    commands.start()
+
+    if input_backend == "terminal":
+        terminal_input = TerminalInput()
+        terminal_input.start()
+    else:
+        # Register keyboard handlers
+        keyboard.on_press(on_key_press)
 
     try:
         while running:
             clear_screen()
 
-            # Get current track info (simplified)
-            track_info = get_current_track_info(device_id)
+            num_bars, max_height, spectrogram_rows = compute_layout(show_spectrogram=show_spectrogram)
 
-            # Generate random bar heights (in a real implementation, these would be based on audio analysis)
-            if track_info.get("playing", False):
-                heights = generate_random_bars(num_bars, max_height)
+            if process_split:
+                # Just pick up the latest results of the worker processes
+                commands.publish_view(num_bars, max_height)
+                commands.sync_player()
+                levels, peaks = commands.read_bars()
             else:
-                # If not playing, show low bars
-                heights = [random.randint(1, 3) for _ in range(num_bars)]
+                # Generate random bar heights (in a real implementation, these would be based on audio analysis)
+                if player.playing:
+                    targets = generate_random_bars(num_bars, max_height)
+                else:
+                    # If not playing, show low bars
+                    targets = [random.randint(1, 3) for _ in range(num_bars)]
+
+                levels = smoother.update(targets)
+                peaks = smoother.peaks
 
             # Draw the visualization
             print(f"\n{Fore.CYAN}Music Visualization{Style.RESET_ALL}")
             print(f"Device ID: {device_id}")
-            print(f"Status: {'Playing' if track_info.get('playing', False) else 'Paused or Stopped'}")
+            status = 'Playing' if player.playing else 'Paused or Stopped'
+            if player.volume is not None:
+                status += f" | Volume: {player.volume}/{player.max_volume}"
+            print(f"Status: {status}")
             print()
 
-            draw_bars(heights)
+            draw_bars(
+                levels_to_rows(levels, max_height),
+                peaks=levels_to_rows(peaks, max_height),
+                max_height=max_height
+            )
+            if show_spectrogram:
+                history.resize(spectrogram_rows, len(levels))
+                history.push(levels)
+                draw_spectrogram(history.frames(), max_height)
             draw_controls()
 
             try:
                 # Wait before updating
-                time.sleep(update_interval)
+                if terminal_input is not None:
+                    # Dispatch keys as soon as the reader thread hands them over instead of sleeping
+                    deadline = time.monotonic() + update_interval
+                    while running and time.monotonic() < deadline:
+                        for key, received in terminal_input.read_keys(deadline - time.monotonic()):
+                            key_latency.record(time.time() - received)
+                            handle_key(key)
+                else:
+                    time.sleep(update_interval)
             except KeyboardInterrupt:
                 # If time.sleep raises KeyboardInterrupt, we're likely in a test environment
                 is_test_environment = True
@@ -138,19 +301,26 @@ def visualize_music(device_id):
         pass
     finally:
         # Clean up
-        keyboard.unhook_all()
+        commands.close()
+        if terminal_input is not None:
+            terminal_input.stop()
+        else:
+            keyboard.unhook_all()
 
         # Only call clear_screen again if we're not in a test environment
         if not is_test_environment:
             clear_screen()
             print("Music visualization stopped.")
+            if key_latency.samples:
+                print(f"Key dispatch latency ({input_backend}): {format_summary(key_latency.summary())}")
 
-def start_visualization(device_id):
+def start_visualization(device_id, **options):
     """
     Start the music visualization in a separate thread.
 
     Args:
         device_id: The ID of the connected Android device
+        **options: Extra options passed through to visualize_music
     """
     try:
         # Check if required packages are installed
@@ -166,4 +336,4 @@ def start_visualization(device_id):
         import keyboard
 
     # Start visualization
-    visualize_music(device_id)
+    visualize_music(device_id, **options)
@@ -0,0 +1,70 @@
+import numpy as np
+
+# Fewest samples per block that still give a usable spectrum. Below this the
+# window is (nearly) all zeros and there are too few bins to spread over bars.
+MIN_FRAME_SIZE = 32
+
+class SpectrumAnalyzer:
+    """
+    Turn blocks of audio samples into bar heights.
+
+    Each block is windowed and transformed with an FFT. The magnitudes are
+    averaged over logarithmically spaced frequency bands, one per bar, and
+    mapped from a decibel range onto the bar height.
+    """
+
+    def __init__(self, sample_rate, frame_size, num_bars, max_height,
+                 min_freq=40.0, max_freq=16000.0, floor_db=-60.0):
+        """
+        Args:
+            sample_rate: Sample rate of the audio in Hz
+            frame_size: Number of samples analysed per block
+            num_bars: Number of bars (frequency bands) to produce
+            max_height: Bar height for a full-scale signal
+            min_freq: Lower edge of the first band in Hz
+            max_freq: Upper edge of the last band in Hz, capped at Nyquist
+            floor_db: Level, relative to full scale, that maps to an empty bar
+
+        Raises:
+            ValueError: If frame_size is smaller than MIN_FRAME_SIZE
+        """
+        if frame_size < MIN_FRAME_SIZE:
+            raise ValueError(f"frame_size must be at least {MIN_FRAME_SIZE} samples, got {frame_size}")
+        self.frame_size = frame_size
+        self.max_height = max_height
+        self.floor_db = floor_db
+        self._window = np.hanning(frame_size)
+        # A full-scale sine then has a magnitude of about 1
+        self._scale = 2.0 / self._window.sum()
+        self._block = np.zeros(frame_size)
+
+        num_bins = frame_size // 2 + 1
+        max_freq = min(max_freq, sample_rate / 2.0)
+        edges = np.geomspace(min_freq, max_freq, num_bars + 1) * frame_size / sample_rate
+        edges = np.clip(np.rint(edges).astype(int), 1, num_bins - 1)
+        # Every band gets at least one bin, even where bins are sparse
+        steps = np.arange(num_bars + 1)
+        edges = np.maximum.accumulate(edges - steps) + steps
+        self._edges = np.minimum(edges, num_bins)
+        self._counts = np.maximum(np.diff(self._edges), 1)
+
+    def analyze(self, samples):
+        """
+        Compute bar heights for one block of mono samples in [-1, 1].
+
+        Shorter blocks are padded with silence and longer ones truncated.
+
+        Returns:
+            Float array of bar heights between 0 and max_height
+        """
+        count = min(len(samples), self.frame_size)
+        self._block[:count] = samples[:count]
+        self._block[count:] = 0.0
+
+        magnitudes = np.abs(np.fft.rfft(self._block * self._window)) * self._scale
+        totals = np.concatenate(([0.0], np.cumsum(magnitudes)))
+        bands = (totals[self._edges[1:]] - totals[self._edges[:-1]]) / self._counts
+
+        decibels = 20.0 * np.log10(np.maximum(bands, 1e-10))
+        heights = (decibels - self.floor_db) / -self.floor_db * self.max_height
+        return np.clip(heights, 0.0, self.max_height)
@@ -0,0 +1,158 @@
+import os
+import queue
+import selectors
+import threading
+import time
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows has no termios
+    termios = None
+    tty = None
+
+# Escape sequences sent by arrow keys, in normal and application cursor mode
+ESCAPE_SEQUENCES = {
+    b"\x1b[A": "up",
+    b"\x1b[B": "down",
+    b"\x1b[C": "right",
+    b"\x1b[D": "left",
+    b"\x1bOA": "up",
+    b"\x1bOB": "down",
+    b"\x1bOC": "right",
+    b"\x1bOD": "left",
+}
+
+# Names for single bytes, matching the names used by the keyboard package
+KEY_NAMES = {
+    b" ": "space",
+    b"\r": "enter",
+    b"\n": "enter",
+    b"\t": "tab",
+    b"\x7f": "backspace",
+}
+
+def decode_keys(data):
+    """
+    Decode raw terminal bytes into key names.
+
+    Args:
+        data: Bytes read from the terminal
+
+    Returns:
+        Tuple of (key names, undecoded trailing bytes). The trailing bytes are
+        an escape sequence cut short by the read and should be prepended to
+        the next read.
+    """
+    keys = []
+    i = 0
+    while i < len(data):
+        if data[i:i + 1] == b"\x1b":
+            sequence = data[i:i + 3]
+            if sequence in ESCAPE_SEQUENCES:
+                keys.append(ESCAPE_SEQUENCES[sequence])
+                i += 3
+                continue
+            if len(sequence) < 3 and sequence in (b"\x1b", b"\x1b[", b"\x1bO"):
+                return keys, data[i:]
+            keys.append("esc")
+            i += 1
+            continue
+
+        char = data[i:i + 1]
+        keys.append(KEY_NAMES.get(char, char.decode("latin-1").lower()))
+        i += 1
+
+    return keys, b""
+
+class TerminalInput:
+    """
+    Read key presses from the controlling terminal in cbreak mode.
+
+    Unlike the keyboard package this needs no root access and no global hook:
+    only keys typed into this terminal are seen. A reader thread blocks in
+    select() and timestamps each key the moment it arrives, so time a key
+    spends waiting while the caller is busy drawing is part of the measured
+    latency, just like the keyboard package's event timestamps.
+    """
+
+    def __init__(self, fd=None):
+        """
+        Args:
+            fd: File descriptor to read from, defaults to the controlling TTY
+        """
+        self._owns_fd = fd is None
+        if fd is None:
+            if termios is None:
+                raise RuntimeError("The terminal input backend is not supported on this platform.")
+            fd = os.open("/dev/tty", os.O_RDONLY)
+        self.fd = fd
+        self._saved_attrs = None
+        self._keys = queue.Queue()
+        self._thread = None
+        # Written to by stop() to wake the reader thread out of select()
+        self._wake_read, self._wake_write = os.pipe()
+        self._selector = selectors.DefaultSelector()
+        self._selector.register(self.fd, selectors.EVENT_READ)
+        self._selector.register(self._wake_read, selectors.EVENT_READ)
+
+    def start(self):
+        """Put the terminal in cbreak mode and start reading keys."""
+        if termios is not None and os.isatty(self.fd):
+            self._saved_attrs = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+        self._thread = threading.Thread(target=self._read_loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop reading, restore the terminal settings and release the descriptors."""
+        if self._thread is not None:
+            os.write(self._wake_write, b"\0")
+            self._thread.join()
+            self._thread = None
+        if self._saved_attrs is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self._saved_attrs)
+            self._saved_attrs = None
+        self._selector.close()
+        os.close(self._wake_read)
+        os.close(self._wake_write)
+        if self._owns_fd:
+            os.close(self.fd)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def _read_loop(self):
+        pending = b""
+        while True:
+            for key, _ in self._selector.select():
+                if key.fd == self._wake_read:
+                    return
+                received = time.time()
+                data = os.read(self.fd, 64)
+                if not data:
+                    return
+                keys, pending = decode_keys(pending + data)
+                for name in keys:
+                    self._keys.put((name, received))
+
+    def read_keys(self, timeout):
+        """
+        Wait up to timeout seconds for key presses.
+
+        Returns:
+            List of (key name, time.time() when the key arrived)
+        """
+        try:
+            keys = [self._keys.get(timeout=max(0.0, timeout))]
+        except queue.Empty:
+            return []
+        while True:
+            try:
+                keys.append(self._keys.get_nowait())
+            except queue.Empty:
+                return keys
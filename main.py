@@ -1,9 +1,124 @@
+import argparse
+import os
+import sys
+
 from utils.ascii_text import gen_art
-from utils.adb import select_device, is_adb_installed, install_adb
+from utils.adb import select_device, is_adb_installed, install_adb, get_connected_devices
+from utils.latency_probe import PROBED_COMMANDS, run_latency_probe, save_results, print_report
 from helpers.soundbars import start_visualization
+from helpers.offline_render import render_wav_to_asciicast
+
+def positive_int(value):
+    """argparse type for options that must be a whole number above zero."""
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
+def parse_args(argv=None):
+    """Parse the command line options."""
+    parser = argparse.ArgumentParser(description="Control music playback on an Android device over ADB.")
+    parser.add_argument(
+        "--spectrogram",
+        action="store_true",
+        help="show a scrolling spectrogram below the sound bars"
+    )
+    parser.add_argument(
+        "--input",
+        choices=["keyboard", "terminal"],
+        default="keyboard",
+        help="read keys with the global keyboard hook (needs root on Linux) "
+             "or from this terminal in cbreak mode"
+    )
+    parser.add_argument(
+        "--process-split",
+        action="store_true",
+        help="run ADB I/O and bar analysis in worker processes, sharing results "
+             "with the renderer through shared memory"
+    )
+    parser.add_argument(
+        "--measure-latency",
+        action="store_true",
+        help="measure how long control commands take to change the state of every "
+             "connected device, instead of starting the player"
+    )
+    parser.add_argument(
+        "--commands",
+        nargs="+",
+        choices=sorted(PROBED_COMMANDS),
+        default=sorted(PROBED_COMMANDS),
+        help="commands to measure with --measure-latency"
+    )
+    parser.add_argument(
+        "--runs",
+        type=positive_int,
+        default=20,
+        help="measurements per command and device with --measure-latency"
+    )
+    parser.add_argument(
+        "--results-dir",
+        default="latency_results",
+        help="directory for the JSON results of --measure-latency"
+    )
+    parser.add_argument(
+        "--render-wav",
+        metavar="WAV",
+        help="render the sound bars for a WAV file into an asciicast recording, "
+             "without a device or terminal"
+    )
+    parser.add_argument(
+        "--output",
+        help="path of the recording written by --render-wav (default: the WAV path with .cast)"
+    )
+    parser.add_argument("--fps", type=positive_int, default=30, help="frames per second for --render-wav")
+    parser.add_argument("--bars", type=positive_int, default=32, help="number of bars for --render-wav")
+    parser.add_argument("--height", type=positive_int, default=16, help="bar height in rows for --render-wav")
+    return parser.parse_args(argv)
+
+def render_offline(args):
+    """Render a WAV file to an asciicast recording and report the throughput."""
+    output = args.output or os.path.splitext(args.render_wav)[0] + ".cast"
+    try:
+        stats = render_wav_to_asciicast(
+            args.render_wav,
+            output,
+            fps=args.fps,
+            num_bars=args.bars,
+            max_height=args.height
+        )
+    except ValueError as e:
+        print(f"Cannot render {args.render_wav}: {e}")
+        return
+    speed = stats["duration_s"] / stats["elapsed_s"] if stats["elapsed_s"] > 0 else float("inf")
+    print(f"Rendered {stats['frames']} frames to {output} in {stats['elapsed_s']:.2f} s "
+          f"({stats['frames_per_second']:.0f} frames/s, {speed:.0f}x real time)")
+
+def measure_latency(args):
+    """Run the actuation latency probe on all connected devices and save the results."""
+    devices = get_connected_devices()
+    if not devices:
+        print("No devices connected. Please connect an Android device and enable USB debugging.")
+        return
+
+    print("Please start playing music on every device; tracks will be paused and skipped.")
+    report = run_latency_probe(devices, args.commands, args.runs)
+    print_report(report)
+    print(f"\nResults saved to {save_results(report, args.results_dir)}")
+
+def main(argv=None):
+    """
+    Main entry point for the ADB Music Player application.
+
+    Args:
+        argv: Command line arguments, without the program name
+    """
+    args = parse_args(argv if argv is not None else [])
+
+    # Offline rendering needs neither ADB nor a device
+    if args.render_wav:
+        render_offline(args)
+        return
 
-def main():
-    """Main entry point for the ADB Music Player application."""
     # Display welcome message
     print(gen_art(text="ADB_Music", font="slant"))
     print("By: TheusHen")
@@ -17,6 +132,10 @@ def main():
             print("Failed to install ADB. Please install it manually.")
             return
 
+    if args.measure_latency:
+        measure_latency(args)
+        return
+
     # Select a device
     print("\nLooking for connected devices...")
     device_id = select_device()
@@ -35,8 +154,13 @@ def main():
     time.sleep(2)
 
     # Start the visualization
-    start_visualization(device_id)
+    start_visualization(
+        device_id,
+        show_spectrogram=args.spectrogram,
+        input_backend=args.input,
+        process_split=args.process_split
+    )
 
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1:])
@@ -10,7 +10,13 @@ from test_music_player import (
     TestAsciiText,
     TestADB,
     TestSoundbars,
+    TestSmoothing,
+    TestPlayerState,
+    TestProcessSplit,
+    TestOfflineRender,
     TestKeyboardControls,
+    TestTerminalInput,
+    TestLatencyProbe,
     TestIntegration
 )
 
@@ -22,7 +28,13 @@ if __name__ == '__main__':
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestAsciiText))
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestADB))
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestSoundbars))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestSmoothing))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestPlayerState))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestProcessSplit))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestOfflineRender))
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestKeyboardControls))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestTerminalInput))
+    test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestLatencyProbe))
     test_suite.addTest(unittest.defaultTestLoader.loadTestsFromTestCase(TestIntegration))
 
     # Run the tests
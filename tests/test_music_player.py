@@ -3,6 +3,15 @@ from unittest.mock import patch, MagicMock, call
 import sys
 import os
 import random
+import subprocess
+import json
+import tempfile
+import wave
+import queue
+import signal
+import time
+import numpy as np
+import threading
 
 # Add the parent directory to the path so we can import the modules
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -11,11 +20,23 @@ from utils.ascii_text import gen_art
 from utils.adb import (
     is_adb_installed, install_adb, get_connected_devices, select_device,
     execute_adb_command, play_pause, next_track, previous_track,
-    volume_up, volume_down, get_current_track_info
+    volume_up, volume_down, get_current_track_info,
+    get_music_volume, set_music_volume
 )
 from helpers.soundbars import (
     clear_screen, generate_random_bars, draw_bars, draw_controls,
-    visualize_music, start_visualization
+    visualize_music, start_visualization, compute_layout, draw_spectrogram
+)
+from helpers.player_state import PlayerState, CommandWorker
+from helpers.shared_frame import SharedFrame
+from helpers.process_split import ProcessSplit, analysis_worker, device_worker
+from helpers.spectrum import MIN_FRAME_SIZE, SpectrumAnalyzer
+from helpers.offline_render import decode_samples, read_wav_blocks, render_wav_to_asciicast
+from helpers.smoothing import BarSmoother, SpectrogramHistory, levels_to_rows
+from helpers.terminal_input import TerminalInput, decode_keys
+from utils.latency import LatencyRecorder, summarize
+from utils.latency_probe import (
+    AdbShell, parse_media_session, measure_once, measure_device, run_latency_probe, save_results
 )
 
 
@@ -100,6 +121,34 @@ class TestADB(unittest.TestCase):
             "device123", ["shell", "input", "keyevent", "KEYCODE_VOLUME_DOWN"]
         )
     
+    @patch('utils.adb.execute_adb_command')
+    def test_get_music_volume(self, mock_execute):
+        """Test get_music_volume parses the media_session output."""
+        mock_execute.return_value = "[V] will get volume\n[V] volume is 7 in range [0..15]"
+        
+        result = get_music_volume("device123")
+        
+        self.assertEqual(result, (7, 15))
+        mock_execute.assert_called_once_with(
+            "device123", ["shell", "cmd", "media_session", "volume", "--stream", "3", "--get"]
+        )
+    
+    @patch('utils.adb.execute_adb_command')
+    def test_get_music_volume_unknown(self, mock_execute):
+        """Test get_music_volume when the output cannot be parsed."""
+        mock_execute.return_value = ""
+        
+        self.assertIsNone(get_music_volume("device123"))
+    
+    @patch('utils.adb.execute_adb_command')
+    def test_set_music_volume(self, mock_execute):
+        """Test set_music_volume sets an absolute level."""
+        set_music_volume("device123", 9)
+        
+        mock_execute.assert_called_once_with(
+            "device123", ["shell", "cmd", "media_session", "volume", "--stream", "3", "--set", "9"]
+        )
+    
     @patch('utils.adb.execute_adb_command')
     def test_get_current_track_info_playing(self, mock_execute):
         """Test get_current_track_info when music is playing."""
@@ -153,6 +202,49 @@ class TestSoundbars(unittest.TestCase):
         # Check that print was called to display controls
         self.assertEqual(mock_print.call_count, 4)
     
+    @patch('builtins.print')
+    def test_draw_bars_fixed_height_with_peaks(self, mock_print):
+        """Test draw_bars with a fixed height and peak markers."""
+        draw_bars([3, 1, 4, 2], width=2, peaks=[5, 1, 4, 3], max_height=8)
+        
+        # Fixed height rows + the base line, regardless of the bar heights
+        self.assertEqual(mock_print.call_count, 9)
+        peak_row = mock_print.call_args_list[8 - 5][0][0]
+        self.assertIn("▔▔", peak_row)
+    
+    @patch('shutil.get_terminal_size')
+    def test_compute_layout(self, mock_size):
+        """Test compute_layout follows the terminal size."""
+        mock_size.return_value = os.terminal_size((61, 40))
+        
+        self.assertEqual(compute_layout(width=3), (20, 28, 0))
+        
+        num_bars, max_height, spectrogram_rows = compute_layout(width=3, show_spectrogram=True)
+        self.assertEqual(num_bars, 20)
+        self.assertEqual(max_height + spectrogram_rows + 1, 28)
+        self.assertGreater(spectrogram_rows, 0)
+    
+    @patch('shutil.get_terminal_size')
+    def test_compute_layout_tiny_terminal(self, mock_size):
+        """Test compute_layout never returns an empty layout."""
+        mock_size.return_value = os.terminal_size((2, 5))
+        
+        num_bars, max_height, _ = compute_layout(width=3)
+        
+        self.assertEqual(num_bars, 1)
+        self.assertGreaterEqual(max_height, 3)
+    
+    @patch('builtins.print')
+    def test_draw_spectrogram(self, mock_print):
+        """Test draw_spectrogram prints a title and one line per frame."""
+        history = SpectrogramHistory(4, 3)
+        history.push([0, 5, 10])
+        
+        draw_spectrogram(history.frames(), max_height=10, width=1)
+        
+        self.assertEqual(mock_print.call_count, 5)
+        self.assertEqual(mock_print.call_args_list[1][0][0], " ▒█")
+    
     @patch('helpers.soundbars.clear_screen')
     @patch('helpers.soundbars.get_current_track_info')
     @patch('helpers.soundbars.generate_random_bars')
@@ -208,6 +300,366 @@ class TestSoundbars(unittest.TestCase):
         mock_unhook.assert_called_once()
 
 
+class TestSmoothing(unittest.TestCase):
+    """Test the bar smoothing and spectrogram history."""
+    
+    def test_attack_and_decay(self):
+        """Test bars rise at the attack rate and fall at the decay rate."""
+        smoother = BarSmoother(2, attack=0.5, decay=0.25)
+        
+        smoother.update([8, 0])
+        self.assertEqual(smoother.levels.tolist(), [4.0, 0.0])
+        
+        smoother.update([0, 0])
+        self.assertEqual(smoother.levels.tolist(), [3.0, 0.0])
+    
+    def test_peak_hold(self):
+        """Test peak markers hold before falling back to the bar."""
+        smoother = BarSmoother(1, attack=1.0, decay=1.0, hold_frames=2, peak_fall=1.0)
+        smoother.update([5])
+        
+        peaks = []
+        for _ in range(5):
+            smoother.update([0])
+            peaks.append(float(smoother.peaks[0]))
+        
+        self.assertEqual(peaks, [5.0, 5.0, 4.0, 3.0, 2.0])
+        self.assertEqual(levels_to_rows(smoother.peaks, 1).tolist(), [1])
+    
+    def test_resize(self):
+        """Test the smoother follows a change in the number of bars."""
+        smoother = BarSmoother(2, attack=1.0)
+        smoother.update([2, 4])
+        
+        levels = smoother.update([0, 0, 0, 0])
+        
+        self.assertEqual(len(levels), 4)
+        self.assertEqual(len(smoother.peaks), 4)
+    
+    def test_spectrogram_ring_buffer(self):
+        """Test the history keeps a fixed number of frames, newest first."""
+        history = SpectrogramHistory(3, 2)
+        for value in range(5):
+            history.push([value, value])
+        
+        frames = history.frames()
+        
+        self.assertEqual(history.shape, (3, 2))
+        self.assertEqual(frames[:, 0].tolist(), [4.0, 3.0, 2.0])
+
+
+class TestPlayerState(unittest.TestCase):
+    """Test the optimistic player state and the command worker."""
+    
+    def test_change_volume_clamps(self):
+        """Test volume changes stay within the device range."""
+        player = PlayerState(volume=14, max_volume=15)
+        
+        self.assertEqual(player.change_volume(1), 15)
+        self.assertEqual(player.change_volume(1), 15)
+        self.assertIsNone(PlayerState().change_volume(1))
+    
+    def test_reconcile_drops_stale_readings(self):
+        """Test a device reading taken before a local change is ignored."""
+        player = PlayerState(playing=False, volume=5, max_volume=15)
+        generation = player.generation
+        player.toggle_playing()
+        
+        self.assertFalse(player.reconcile(generation, False, (3, 15)))
+        self.assertTrue(player.playing)
+        self.assertEqual(player.volume, 5)
+        
+        self.assertTrue(player.reconcile(player.generation, False, (3, 15)))
+        self.assertFalse(player.playing)
+        self.assertEqual(player.volume, 3)
+    
+    def test_worker_coalesces_keyed_commands(self):
+        """Test queued commands with the same key are replaced, not repeated."""
+        worker = CommandWorker()
+        calls = []
+        
+        # Not started yet, so the commands are only queued
+        worker._running = True
+        worker.submit(calls.append, "play")
+        worker.submit(calls.append, 8, key="volume")
+        worker.submit(calls.append, 9, key="volume")
+        worker._running = False
+        worker._run()
+        
+        self.assertEqual(calls, ["play", 9])
+    
+    def test_worker_runs_inline_when_stopped(self):
+        """Test commands submitted while the worker is stopped run right away."""
+        worker = CommandWorker()
+        calls = []
+        
+        worker.submit(calls.append, "next")
+        
+        self.assertEqual(calls, ["next"])
+    
+    def test_worker_calls_on_idle(self):
+        """Test the idle callback runs once the queue has been idle."""
+        idle = threading.Event()
+        worker = CommandWorker(on_idle=idle.set, idle_interval=0.01)
+        
+        worker.start()
+        try:
+            self.assertTrue(idle.wait(1.0))
+        finally:
+            worker.close()
+    
+    @patch('helpers.soundbars.clear_screen')
+    @patch('helpers.soundbars.get_current_track_info', return_value={"playing": True})
+    @patch('helpers.soundbars.get_music_volume', return_value=(5, 15))
+    @patch('helpers.soundbars.set_music_volume')
+    @patch('helpers.soundbars.volume_up')
+    @patch('helpers.soundbars.TerminalInput')
+    @patch('builtins.print')
+    def test_volume_keys_set_absolute_volume(self, mock_print, mock_terminal_input, mock_volume_up,
+                                             mock_set_volume, mock_get_volume, mock_get_track,
+                                             mock_clear):
+        """Test volume keys update the shown volume and send an absolute level."""
+        terminal_input = mock_terminal_input.return_value
+        terminal_input.read_keys.side_effect = [[("up", 0.0), ("up", 0.0), ("q", 0.0)]]
+        
+        visualize_music("device123", input_backend="terminal")
+        
+        mock_set_volume.assert_called_with("device123", 7)
+        mock_volume_up.assert_not_called()
+        printed = [c[0][0] for c in mock_print.call_args_list if c[0]]
+        self.assertIn("Status: Playing | Volume: 5/15", printed)
+
+
+class TestProcessSplit(unittest.TestCase):
+    """Test the shared memory frame and the worker processes."""
+    
+    def setUp(self):
+        self.frame = SharedFrame(max_bars=4)
+        self.addCleanup(self.frame.close)
+    
+    def test_seqlock_read_write(self):
+        """Test a reader attached by name sees complete writes."""
+        reader = SharedFrame(max_bars=4, name=self.frame.name)
+        self.addCleanup(reader.close)
+        out = np.zeros(SharedFrame.TRACK_SIZE)
+        
+        self.assertEqual(reader.track.read(out), 0)
+        self.frame.track.write([1, 7, 15, 3])
+        sequence = reader.track.read(out)
+        
+        self.assertEqual(sequence, 2)
+        self.assertEqual(out.tolist(), [1.0, 7.0, 15.0, 3.0])
+    
+    def test_seqlock_read_gives_up_on_dead_writer(self):
+        """Test a write that never finished does not make readers spin forever."""
+        out = np.zeros(SharedFrame.TRACK_SIZE)
+        self.frame.track.write([1, 7, 15, 3])
+        self.frame.track.read(out)
+        
+        # A writer killed between its two sequence stores leaves it odd
+        self.frame.track._sequence[0] += 1
+        self.frame.track._values[:] = 9
+        
+        self.assertIsNone(self.frame.track.read(out))
+        self.assertEqual(out.tolist(), [1.0, 7.0, 15.0, 3.0])
+    
+    def test_sync_player_and_read_bars(self):
+        """Test the renderer picks up device state and bars from the frame."""
+        player = PlayerState()
+        split = ProcessSplit("device123", player, max_bars=4, update_interval=0.1)
+        split.frame = self.frame
+        split._bars = np.zeros(self.frame.bars_size)
+        
+        self.frame.track.write([1, 6, 15, 0])
+        self.frame.bars.write([2, 3.0, 5.0, 0, 0, 4.0, 6.0, 0, 0])
+        split.sync_player()
+        levels, peaks = split.read_bars()
+        
+        self.assertTrue(player.playing)
+        self.assertEqual(player.volume, 6)
+        self.assertEqual(levels.tolist(), [3.0, 5.0])
+        self.assertEqual(peaks.tolist(), [4.0, 6.0])
+    
+    def test_sync_player_ignores_stale_generation(self):
+        """Test a device reading tagged with an old generation is dropped."""
+        player = PlayerState()
+        player.toggle_playing()
+        split = ProcessSplit("device123", player, max_bars=4, update_interval=0.1)
+        split.frame = self.frame
+        
+        self.frame.track.write([0, -1, -1, 0])
+        split.sync_player()
+        
+        self.assertTrue(player.playing)
+        self.assertIsNone(player.volume)
+    
+    def test_analysis_worker_publishes_bars(self):
+        """Test the analysis worker follows the requested view."""
+        # The worker ignores SIGINT, restore it for the test runner
+        self.addCleanup(signal.signal, signal.SIGINT, signal.getsignal(signal.SIGINT))
+        stop = threading.Event()
+        self.frame.view.write([3, 10, 1])
+        timer = threading.Timer(0.05, stop.set)
+        timer.start()
+        
+        analysis_worker(self.frame.name, 4, 0.01, stop)
+        
+        bars = np.zeros(self.frame.bars_size)
+        self.assertGreater(self.frame.bars.read(bars), 0)
+        self.assertEqual(bars[0], 3)
+        self.assertTrue(np.all(bars[1:4] > 0))
+        self.assertEqual(bars[4], 0)
+    
+    @patch('utils.adb.get_music_volume', return_value=(4, 15))
+    @patch('utils.adb.get_current_track_info', return_value={"playing": True})
+    def test_device_worker(self, mock_get_track, mock_get_volume):
+        """Test the device worker runs commands and publishes the device state."""
+        # The worker ignores SIGINT, restore it for the test runner
+        self.addCleanup(signal.signal, signal.SIGINT, signal.getsignal(signal.SIGINT))
+        commands = queue.Queue()
+        stop = threading.Event()
+        command = MagicMock()
+        commands.put((command, ("device123",), None, 5))
+        threading.Timer(0.3, stop.set).start()
+        
+        device_worker("device123", self.frame.name, 4, commands, stop)
+        
+        command.assert_called_once_with("device123")
+        track = np.zeros(SharedFrame.TRACK_SIZE)
+        self.frame.track.read(track)
+        self.assertEqual(track[:3].tolist(), [1.0, 4.0, 15.0])
+
+
+    @patch('builtins.print')
+    def test_workers_ignore_sigint(self, mock_print):
+        """Test Ctrl-C does not kill the worker processes; close() still stops them."""
+        split = ProcessSplit("device123", PlayerState(), max_bars=4, update_interval=0.01)
+        split.start()
+        try:
+            split.publish_view(2, 5)
+            track = np.zeros(SharedFrame.TRACK_SIZE)
+            bars = np.zeros(split.frame.bars_size)
+            deadline = time.monotonic() + 10
+            while time.monotonic() < deadline and not (
+                    split.frame.track.read(track) and split.frame.bars.read(bars)):
+                time.sleep(0.01)
+            processes = list(split._processes)
+            
+            for process in processes:
+                os.kill(process.pid, signal.SIGINT)
+            time.sleep(0.2)
+            self.assertTrue(all(process.is_alive() for process in processes))
+        finally:
+            split.close(timeout=5)
+        
+        self.assertEqual([process.exitcode for process in processes], [0, 0])
+
+
+class TestOfflineRender(unittest.TestCase):
+    """Test the offline WAV to asciicast rendering."""
+    
+    def write_wav(self, path, seconds, frequency, sample_rate=8000, channels=1):
+        t = np.arange(int(seconds * sample_rate)) / sample_rate
+        samples = (0.5 * np.sin(2 * np.pi * frequency * t) * 32767).astype("<i2")
+        with wave.open(path, "wb") as wav:
+            wav.setnchannels(channels)
+            wav.setsampwidth(2)
+            wav.setframerate(sample_rate)
+            wav.writeframes(np.repeat(samples, channels).tobytes())
+    
+    def test_decode_samples(self):
+        """Test PCM bytes of different widths are decoded to mono floats."""
+        self.assertEqual(decode_samples(bytes([0, 128, 255]), 1, 1).tolist(), [-1.0, 0.0, 127 / 128])
+        stereo = np.array([16384, 0, -32768, -32768], dtype="<i2").tobytes()
+        self.assertEqual(decode_samples(stereo, 2, 2).tolist(), [0.25, -1.0])
+        self.assertEqual(decode_samples(bytes([0, 0, 0x80]), 3, 1).tolist(), [-1.0])
+        with self.assertRaises(ValueError):
+            decode_samples(b"", 5, 1)
+    
+    def test_read_wav_blocks(self):
+        """Test blocks follow the frame rate and cover every sample."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "tone.wav")
+            self.write_wav(path, 1.0, 440, sample_rate=8000)
+            
+            with wave.open(path, "rb") as wav:
+                sizes = [len(block) for block in read_wav_blocks(wav, 3)]
+        
+        self.assertEqual(sizes, [2666, 2667, 2667])
+    
+    def test_spectrum_analyzer(self):
+        """Test a low tone lights the low bars and leaves the high bars empty."""
+        sample_rate = 8000
+        analyzer = SpectrumAnalyzer(sample_rate, 800, num_bars=8, max_height=10)
+        t = np.arange(800) / sample_rate
+        
+        heights = analyzer.analyze(np.sin(2 * np.pi * 100 * t))
+        
+        self.assertEqual(len(heights), 8)
+        self.assertEqual(int(np.argmax(heights)), 1)
+        self.assertGreater(heights[1], 8)
+        self.assertEqual(heights[-1], 0)
+        self.assertTrue(np.all(analyzer.analyze(np.zeros(10)) == 0))
+        with self.assertRaises(ValueError):
+            SpectrumAnalyzer(sample_rate, 2, num_bars=8, max_height=10)
+    
+    def test_render_wav_to_asciicast(self):
+        """Test the recording has a header and one frame per 1/fps seconds."""
+        with tempfile.TemporaryDirectory() as directory:
+            wav_path = os.path.join(directory, "tone.wav")
+            cast_path = os.path.join(directory, "tone.cast")
+            self.write_wav(wav_path, 2.0, 440, channels=2)
+            
+            stats = render_wav_to_asciicast(wav_path, cast_path, fps=10, num_bars=8, max_height=6)
+            
+            with open(cast_path, encoding="utf-8") as f:
+                header = json.loads(f.readline())
+                events = [json.loads(line) for line in f]
+        
+        self.assertEqual(header["version"], 2)
+        self.assertEqual((header["width"], header["height"]), (8 * 2, 8))
+        self.assertEqual(stats["frames"], 20)
+        self.assertEqual(len(events), 20)
+        self.assertEqual(events[1][:2], [0.1, "o"])
+        self.assertEqual(events[-1][2].count("\r\n"), 7)
+        self.assertGreater(stats["frames_per_second"], 0)
+    
+    def test_render_is_reproducible(self):
+        """Test rendering the same file twice gives identical recordings."""
+        with tempfile.TemporaryDirectory() as directory:
+            wav_path = os.path.join(directory, "tone.wav")
+            self.write_wav(wav_path, 0.5, 440)
+            
+            recordings = []
+            for name in ("first.cast", "second.cast"):
+                cast_path = os.path.join(directory, name)
+                render_wav_to_asciicast(wav_path, cast_path, fps=10, num_bars=8)
+                with open(cast_path, encoding="utf-8") as f:
+                    recordings.append(f.read())
+        
+        self.assertEqual(recordings[0], recordings[1])
+        self.assertNotIn("timestamp", json.loads(recordings[0].splitlines()[0]))
+    
+    def test_render_rejects_invalid_fps(self):
+        """Test fps leaving too few samples per frame raises before any output is written."""
+        with tempfile.TemporaryDirectory() as directory:
+            wav_path = os.path.join(directory, "tone.wav")
+            cast_path = os.path.join(directory, "tone.cast")
+            self.write_wav(wav_path, 0.1, 440, sample_rate=8000)
+            
+            for fps in (0, -5, 4000, 8000 // MIN_FRAME_SIZE + 1):
+                with self.assertRaises(ValueError):
+                    render_wav_to_asciicast(wav_path, cast_path, fps=fps)
+            
+            self.assertFalse(os.path.exists(cast_path))
+            
+            # The highest allowed rate still draws the tone
+            render_wav_to_asciicast(wav_path, cast_path, fps=8000 // MIN_FRAME_SIZE, num_bars=8)
+            with open(cast_path, encoding="utf-8") as f:
+                last = json.loads(f.readlines()[-1])
+            self.assertIn("█", last[2])
+
+
 class TestKeyboardControls(unittest.TestCase):
     """Test the keyboard controls functionality."""
     
@@ -262,6 +714,259 @@ class TestKeyboardControls(unittest.TestCase):
             mock_next_track.assert_called_once_with("device123")
 
 
+class TestTerminalInput(unittest.TestCase):
+    """Test the raw terminal input backend."""
+    
+    def test_decode_keys(self):
+        """Test decoding plain keys and arrow escape sequences."""
+        keys, rest = decode_keys(b" Q\x1b[A\x1b[D\x1bOC")
+        
+        self.assertEqual(keys, ["space", "q", "up", "left", "right"])
+        self.assertEqual(rest, b"")
+    
+    def test_decode_keys_split_sequence(self):
+        """Test an escape sequence cut short by a read is kept for the next one."""
+        keys, rest = decode_keys(b"q\x1b[")
+        self.assertEqual(keys, ["q"])
+        self.assertEqual(rest, b"\x1b[")
+        
+        keys, rest = decode_keys(rest + b"B")
+        self.assertEqual(keys, ["down"])
+        self.assertEqual(rest, b"")
+    
+    def test_read_keys_from_pipe(self):
+        """Test TerminalInput reads and decodes keys from a descriptor."""
+        read_fd, write_fd = os.pipe()
+        try:
+            with TerminalInput(fd=read_fd) as terminal_input:
+                self.assertEqual(terminal_input.read_keys(0), [])
+                
+                os.write(write_fd, b"\x1b[C")
+                keys = terminal_input.read_keys(1.0)
+            
+            self.assertEqual([key for key, _ in keys], ["right"])
+            self.assertIsInstance(keys[0][1], float)
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+    
+    def test_keys_timestamped_on_arrival(self):
+        """Test a key is timestamped when it arrives, not when the caller reads it."""
+        read_fd, write_fd = os.pipe()
+        try:
+            with TerminalInput(fd=read_fd) as terminal_input:
+                os.write(write_fd, b"q")
+                # The caller is busy, e.g. drawing a frame
+                time.sleep(0.2)
+                keys = terminal_input.read_keys(1.0)
+                read_at = time.time()
+            
+            self.assertEqual([key for key, _ in keys], ["q"])
+            self.assertGreaterEqual(read_at - keys[0][1], 0.15)
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+    
+    def test_latency_summary(self):
+        """Test latency samples are summarized in milliseconds."""
+        recorder = LatencyRecorder()
+        for seconds in [0.004, 0.001, 0.003, 0.002]:
+            recorder.record(seconds)
+        
+        summary = recorder.summary()
+        
+        self.assertEqual(summary["count"], 4)
+        self.assertAlmostEqual(summary["min_ms"], 1.0)
+        self.assertAlmostEqual(summary["p50_ms"], 2.0)
+        self.assertAlmostEqual(summary["max_ms"], 4.0)
+        self.assertEqual(summarize([]), {"count": 0})
+    
+    @patch('helpers.soundbars.clear_screen')
+    @patch('helpers.soundbars.get_current_track_info', return_value={"playing": False})
+    @patch('helpers.soundbars.get_music_volume', return_value=None)
+    @patch('helpers.soundbars.next_track')
+    @patch('helpers.soundbars.TerminalInput')
+    @patch('builtins.print')
+    @patch('keyboard.on_press')
+    def test_visualize_music_terminal_backend(self, mock_on_press, mock_print,
+                                              mock_terminal_input, mock_next_track,
+                                              mock_get_volume, mock_get_track, mock_clear):
+        """Test visualize_music dispatches keys read from the terminal."""
+        terminal_input = mock_terminal_input.return_value
+        terminal_input.read_keys.side_effect = [[("right", 0.0), ("q", 0.0)]]
+        
+        visualize_music("device123", input_backend="terminal")
+        
+        mock_next_track.assert_called_once_with("device123")
+        mock_on_press.assert_not_called()
+        terminal_input.start.assert_called_once()
+        terminal_input.stop.assert_called_once()
+
+
+class TestLatencyProbe(unittest.TestCase):
+    """Test the actuation latency probe."""
+    
+    def test_parse_media_session(self):
+        """Test the first session's state and description are extracted."""
+        output = (
+            "      state=PlaybackState {state=3, position=1000, buffered position=0}\n"
+            "      metadata: size=7, description=Song, Artist, Album\n"
+            "      state=PlaybackState {state=2, position=0, buffered position=0}\n"
+        )
+        
+        result = parse_media_session(output)
+        
+        self.assertEqual(result, {"state": "3", "description": "Song, Artist, Album"})
+        self.assertEqual(parse_media_session(""), {"state": None, "description": None})
+    
+    def test_parse_media_session_named_state(self):
+        """Test the state is read from the format used by Android 13 and later."""
+        output = (
+            "      state=PlaybackState {state=PLAYING(3), position=1000, buffered position=0}\n"
+            "      metadata: size=7, description=Song, Artist, Album\n"
+        )
+        
+        result = parse_media_session(output)
+        
+        self.assertEqual(result, {"state": "3", "description": "Song, Artist, Album"})
+    
+    def test_parse_media_session_pairs_per_session(self):
+        """Test a description is never taken from another session."""
+        output = (
+            "      state=PlaybackState {state=3, position=1000, buffered position=0}\n"
+            "      state=null\n"
+            "      metadata: size=7, description=Other Song, Artist, Album\n"
+        )
+        
+        result = parse_media_session(output)
+        
+        self.assertEqual(result, {"state": "3", "description": None})
+        self.assertEqual(
+            parse_media_session("  state=null\n  metadata: size=1, description=Song\n"),
+            {"state": None, "description": "Song"}
+        )
+    
+    def test_measure_once_detects_change(self):
+        """Test measure_once returns once the probed field changes."""
+        states = iter(["3", "3", "3", "2"])
+        probe = lambda: {"state": next(states)}
+        send = MagicMock()
+        probe_latency = LatencyRecorder()
+        
+        latency = measure_once("device123", probe, send, "state", 5.0, probe_latency)
+        
+        send.assert_called_once_with("device123")
+        self.assertIsNotNone(latency)
+        self.assertEqual(len(probe_latency.samples), 3)
+    
+    def test_measure_once_timeout(self):
+        """Test measure_once returns None if the state never changes."""
+        latency = measure_once(
+            "device123", lambda: {"state": "3"}, MagicMock(), "state", 0.01, LatencyRecorder()
+        )
+        
+        self.assertIsNone(latency)
+    
+    @patch('time.sleep')
+    @patch('utils.latency_probe.AdbShell')
+    def test_measure_device(self, mock_shell, mock_sleep):
+        """Test measure_device collects samples and timeouts per command."""
+        shell = mock_shell.return_value.__enter__.return_value
+        shell.run.side_effect = [
+            "state=PlaybackState {state=3,", "state=PlaybackState {state=2,",
+            "state=PlaybackState {state=2,", "state=PlaybackState {state=3,",
+        ]
+        send = MagicMock()
+        
+        with patch.dict('utils.latency_probe.PROBED_COMMANDS', {"play_pause": (send, "state")}):
+            result = measure_device("device123", ["play_pause"], runs=2)
+        
+        command = result["commands"]["play_pause"]
+        self.assertEqual(send.call_count, 2)
+        self.assertEqual(command["timeouts"], 0)
+        self.assertEqual(len(command["samples_ms"]), 2)
+        self.assertEqual(command["summary"]["count"], 2)
+        self.assertEqual(result["probe_round_trip"]["count"], 2)
+    
+    def local_shell(self, timeout):
+        """An AdbShell talking to a local sh instead of a device."""
+        real_popen = subprocess.Popen
+        with patch('subprocess.Popen', side_effect=lambda args, **kwargs: real_popen(["sh"], **kwargs)):
+            shell = AdbShell("device123", timeout=timeout)
+        self.addCleanup(shell.close)
+        return shell
+    
+    def test_adb_shell_run(self):
+        """Test commands run in the persistent shell return their output."""
+        shell = self.local_shell(timeout=5.0)
+        
+        self.assertEqual(shell.run("echo one; echo two"), "one\ntwo\n")
+        self.assertEqual(shell.run("true"), "")
+    
+    def test_adb_shell_timeout(self):
+        """Test a command that never finishes raises instead of blocking."""
+        shell = self.local_shell(timeout=0.2)
+        
+        with self.assertRaises(TimeoutError):
+            shell.run("sleep 1")
+    
+    def test_adb_shell_exited(self):
+        """Test a shell that went away, e.g. an unplugged device, raises."""
+        shell = self.local_shell(timeout=5.0)
+        
+        with self.assertRaises(ConnectionError):
+            shell.run("exit")
+    
+    @patch('time.sleep')
+    @patch('builtins.print')
+    @patch('utils.latency_probe.AdbShell')
+    def test_failed_device_is_recorded(self, mock_shell, mock_print, mock_sleep):
+        """Test a failing device is recorded in the report and the others still run."""
+        good = MagicMock()
+        good.__enter__.return_value.run.side_effect = [
+            "state=PlaybackState {state=3,", "state=PlaybackState {state=2,",
+        ]
+        bad = MagicMock()
+        bad.__enter__.return_value.run.side_effect = BrokenPipeError("broken pipe")
+        mock_shell.side_effect = [bad, good]
+        
+        with patch.dict('utils.latency_probe.PROBED_COMMANDS', {"play_pause": (MagicMock(), "state")}):
+            report = run_latency_probe(
+                [("bad123", "Bad Phone"), ("good123", "Good Phone")], ["play_pause"], runs=1
+            )
+        
+        self.assertEqual(report["devices"]["bad123"]["error"], "BrokenPipeError: broken pipe")
+        self.assertEqual(report["devices"]["bad123"]["commands"], {})
+        self.assertNotIn("error", report["devices"]["good123"])
+        self.assertEqual(report["devices"]["good123"]["commands"]["play_pause"]["summary"]["count"], 1)
+    
+    def test_save_results(self):
+        """Test reports are written as timestamped JSON files."""
+        report = {"created": "2024-01-02T03:04:05", "runs": 1, "devices": {}}
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = save_results(report, directory)
+            
+            self.assertEqual(os.path.basename(path), "latency-20240102T030405.json")
+            with open(path) as f:
+                self.assertEqual(json.load(f), report)
+    
+    def test_save_results_keeps_earlier_runs(self):
+        """Test a report with the same timestamp does not overwrite an earlier one."""
+        first = {"created": "2024-01-02T03:04:05.678", "runs": 1, "devices": {}}
+        second = dict(first, runs=2)
+        
+        with tempfile.TemporaryDirectory() as directory:
+            paths = [save_results(first, directory), save_results(second, directory)]
+            
+            self.assertEqual(
+                [os.path.basename(path) for path in paths],
+                ["latency-20240102T030405.678.json", "latency-20240102T030405.678-2.json"]
+            )
+            with open(paths[0]) as f:
+                self.assertEqual(json.load(f), first)
+
+
 class TestIntegration(unittest.TestCase):
     """Integration tests for the music player."""
     
@@ -282,7 +987,64 @@ class TestIntegration(unittest.TestCase):
         # Verify the expected flow
         mock_is_installed.assert_called_once()
         mock_get_devices.assert_called_once()
-        mock_visualize.assert_called_once_with("device123")
+        mock_visualize.assert_called_once_with(
+            "device123", show_spectrogram=False, input_backend="keyboard", process_split=False
+        )
+
+    
+    @patch('main.is_adb_installed', return_value=True)
+    @patch('main.get_connected_devices', return_value=[("device123", "Test Phone")])
+    @patch('main.run_latency_probe')
+    @patch('main.save_results', return_value="latency_results/latency.json")
+    @patch('helpers.soundbars.visualize_music')
+    @patch('builtins.print')
+    def test_main_measure_latency(self, mock_print, mock_visualize, mock_save, mock_probe,
+                                  mock_get_devices, mock_is_installed):
+        """Test --measure-latency runs the probe instead of the player."""
+        from main import main
+        mock_probe.return_value = {"devices": {}}
+        
+        main(["--measure-latency", "--runs", "3", "--commands", "next_track"])
+        
+        mock_probe.assert_called_once_with([("device123", "Test Phone")], ["next_track"], 3)
+        mock_save.assert_called_once_with({"devices": {}}, "latency_results")
+        mock_visualize.assert_not_called()
+
+    
+    @patch('main.is_adb_installed')
+    @patch('main.render_wav_to_asciicast')
+    @patch('builtins.print')
+    def test_main_render_wav(self, mock_print, mock_render, mock_is_installed):
+        """Test --render-wav renders offline without touching ADB."""
+        from main import main
+        mock_render.return_value = {
+            "frames": 30, "duration_s": 1.0, "elapsed_s": 0.01, "frames_per_second": 3000.0
+        }
+        
+        main(["--render-wav", "song.wav", "--fps", "30"])
+        
+        mock_render.assert_called_once_with("song.wav", "song.cast", fps=30, num_bars=32, max_height=16)
+        mock_is_installed.assert_not_called()
+    
+    @patch('sys.stderr')
+    def test_parse_args_rejects_non_positive(self, mock_stderr):
+        """Test --fps, --bars and --height must be positive."""
+        from main import parse_args
+        
+        for option in ("--fps", "--bars", "--height"):
+            with self.assertRaises(SystemExit):
+                parse_args(["--render-wav", "song.wav", option, "0"])
+        self.assertEqual(parse_args(["--fps", "12"]).fps, 12)
+    
+    @patch('sys.stderr')
+    def test_parse_args_rejects_non_positive_runs(self, mock_stderr):
+        """Test --runs must be positive."""
+        from main import parse_args
+        
+        for runs in ("0", "-3"):
+            with self.assertRaises(SystemExit):
+                parse_args(["--measure-latency", "--runs", runs])
+        self.assertEqual(parse_args(["--runs", "5"]).runs, 5)
 
 
 if __name__ == '__main__':
@@ -2,6 +2,7 @@ import os
 import subprocess
 import sys
 import platform
+import re
 import time
 from typing import List, Optional, Tuple
 
@@ -203,6 +204,8 @@ def execute_adb_command(device_id: str, command: List[str]) -> str:
         return ""
 
 # Music control functions
+MUSIC_STREAM = "3"  # AudioManager.STREAM_MUSIC
+
 def play_pause(device_id: str) -> None:
     """Toggle play/pause on the device."""
     execute_adb_command(device_id, ["shell", "input", "keyevent", "KEYCODE_MEDIA_PLAY_PAUSE"])
@@ -223,6 +226,33 @@ def volume_down(device_id: str) -> None:
     """Decrease the volume."""
     execute_adb_command(device_id, ["shell", "input", "keyevent", "KEYCODE_VOLUME_DOWN"])
 
+def get_music_volume(device_id: str) -> Optional[Tuple[int, int]]:
+    """
+    Get the current volume of the music stream.
+
+    Returns:
+        Tuple of (volume, max_volume) or None if it could not be read
+    """
+    try:
+        output = execute_adb_command(
+            device_id,
+            ["shell", "cmd", "media_session", "volume", "--stream", MUSIC_STREAM, "--get"]
+        )
+        match = re.search(r"volume is (\d+) in range \[(\d+)\.\.(\d+)\]", output)
+        if not match:
+            return None
+        return int(match.group(1)), int(match.group(3))
+    except Exception as e:
+        print(f"Error getting volume: {e}")
+        return None
+
+def set_music_volume(device_id: str, volume: int) -> None:
+    """Set the music stream to an absolute volume level."""
+    execute_adb_command(
+        device_id,
+        ["shell", "cmd", "media_session", "volume", "--stream", MUSIC_STREAM, "--set", str(volume)]
+    )
+
 def get_current_track_info(device_id: str) -> dict:
     """
     Get information about the currently playing track.
@@ -0,0 +1,55 @@
+import math
+from typing import Dict, List, Sequence
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence."""
+    if not sorted_values:
+        return 0.0
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[rank]
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    Summarize latency samples.
+
+    Args:
+        samples: Latencies in seconds
+
+    Returns:
+        Dictionary with the sample count and statistics in milliseconds
+    """
+    if not samples:
+        return {"count": 0}
+
+    values = sorted(sample * 1000.0 for sample in samples)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values),
+        "min_ms": values[0],
+        "p50_ms": percentile(values, 0.50),
+        "p90_ms": percentile(values, 0.90),
+        "p99_ms": percentile(values, 0.99),
+        "max_ms": values[-1],
+    }
+
+def format_summary(summary: Dict[str, float]) -> str:
+    """Format a summary from summarize() as a single line."""
+    if not summary.get("count"):
+        return "no samples"
+    return (f"n={summary['count']} mean={summary['mean_ms']:.2f} ms "
+            f"p50={summary['p50_ms']:.2f} ms p90={summary['p90_ms']:.2f} ms "
+            f"p99={summary['p99_ms']:.2f} ms max={summary['max_ms']:.2f} ms")
+
+class LatencyRecorder:
+    """Collect latency samples for later summarizing."""
+
+    def __init__(self) -> None:
+        self.samples: List[float] = []
+
+    def record(self, seconds: float) -> None:
+        """Record one latency sample, in seconds."""
+        self.samples.append(seconds)
+
+    def summary(self) -> Dict[str, float]:
+        """Summarize the recorded samples."""
+        return summarize(self.samples)
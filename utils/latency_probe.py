@@ -0,0 +1,272 @@
+import json
+import os
+import re
+import queue
+import subprocess
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from utils.adb import play_pause, next_track
+from utils.latency import LatencyRecorder, format_summary, summarize
+
+# Only the lines the probe needs, so each poll transfers a few hundred bytes
+# instead of the whole dumpsys output. Every session prints one state= line
+# (state=null without a playback state) before its metadata line.
+PROBE_COMMAND = "dumpsys media_session | grep -E '^ *state=|description='"
+
+def parse_media_session(output: str) -> Dict[str, Optional[str]]:
+    """
+    Extract the playback state and track description from the probe output.
+
+    Only the first session is used, which is the most recently active one.
+    Its description is the one that follows its state line, before the next
+    session's state line, so it is never taken from another player.
+    """
+    result: Dict[str, Optional[str]] = {"state": None, "description": None}
+    seen_session = False
+    for line in output.splitlines():
+        line = line.strip()
+        if line.startswith("state="):
+            if seen_session:
+                break
+            seen_session = True
+            # Android 13+ prints the state name too, e.g. state=PLAYING(3)
+            state = re.match(r"state=PlaybackState \{state=(?:\w+\()?(\d+)", line)
+            result["state"] = state.group(1) if state else None
+        elif seen_session:
+            description = re.search(r"description=(.*)", line)
+            if description:
+                result["description"] = description.group(1).strip()
+    return result
+
+# Commands that can be measured, with the probe field each one changes
+PROBED_COMMANDS: Dict[str, Tuple[Callable[[str], None], str]] = {
+    "play_pause": (play_pause, "state"),
+    "next_track": (next_track, "description"),
+}
+
+class AdbShell:
+    """
+    A persistent `adb shell` session.
+
+    Reusing one shell avoids starting a new adb process and a new shell for
+    every poll, which keeps the probe interval in the low milliseconds. Output
+    is read by a background thread, so a hung adb cannot block the caller
+    past its timeout.
+    """
+
+    def __init__(self, device_id: str, timeout: float = 5.0) -> None:
+        """
+        Args:
+            device_id: The ID of the device to open a shell on
+            timeout: Seconds to wait for each command's output
+        """
+        self.timeout = timeout
+        self._sentinel = f"__probe_done_{uuid.uuid4().hex}__"
+        self._lines: "queue.Queue[Optional[str]]" = queue.Queue()
+        self._process = subprocess.Popen(
+            ["adb", "-s", device_id, "shell"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            bufsize=1
+        )
+        threading.Thread(target=self._read_output, daemon=True).start()
+
+    def _read_output(self) -> None:
+        for line in self._process.stdout:
+            self._lines.put(line)
+        # None marks the end of the output, the shell has exited
+        self._lines.put(None)
+
+    def run(self, command: str) -> str:
+        """
+        Run a command in the shell and return its output.
+
+        Raises:
+            TimeoutError: If the output did not arrive within the timeout
+            ConnectionError: If the shell exited, e.g. the device was disconnected
+        """
+        self._process.stdin.write(f"{command}; echo {self._sentinel}\n")
+        self._process.stdin.flush()
+
+        deadline = time.monotonic() + self.timeout
+        lines = []
+        while True:
+            try:
+                line = self._lines.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                raise TimeoutError(f"No output from adb shell within {self.timeout} s")
+            if line is None:
+                raise ConnectionError("adb shell exited")
+            if line.strip() == self._sentinel:
+                return "".join(lines)
+            lines.append(line)
+
+    def close(self) -> None:
+        """End the shell session."""
+        try:
+            self._process.stdin.write("exit\n")
+            self._process.stdin.flush()
+        except (OSError, ValueError):
+            pass
+        try:
+            self._process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+
+    def __enter__(self) -> "AdbShell":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+def measure_once(device_id: str, probe: Callable[[], Dict[str, Optional[str]]],
+                 send: Callable[[str], None], field: str, timeout: float,
+                 probe_latency: LatencyRecorder) -> Optional[float]:
+    """
+    Send one command and poll until the device state changes.
+
+    Args:
+        device_id: The ID of the device to control
+        probe: Returns the parsed device state
+        send: Control command to measure, such as next_track
+        field: Probe field the command is expected to change
+        timeout: Seconds to wait for the change
+        probe_latency: Recorder for the round-trip time of each poll
+
+    Returns:
+        Seconds from the command call until the change was seen, or None on timeout
+    """
+    baseline = probe()[field]
+    start = time.perf_counter()
+    send(device_id)
+
+    while time.perf_counter() - start < timeout:
+        poll_start = time.perf_counter()
+        current = probe()[field]
+        now = time.perf_counter()
+        probe_latency.record(now - poll_start)
+        if current != baseline:
+            return now - start
+    return None
+
+def measure_device(device_id: str, commands: Sequence[str], runs: int,
+                   timeout: float = 5.0, settle: float = 1.0) -> Dict:
+    """
+    Measure actuation latency of each command on one device.
+
+    Args:
+        device_id: The ID of the device to measure
+        commands: Names of commands from PROBED_COMMANDS
+        runs: Number of measurements per command
+        timeout: Seconds to wait for each state change
+        settle: Seconds to wait between measurements
+
+    Returns:
+        Per-command samples and summaries, plus the probe round-trip summary.
+        If the device failed, "error" describes why and "commands" holds the
+        commands that completed before the failure.
+    """
+    probe_latency = LatencyRecorder()
+    results = {}
+    error = None
+
+    try:
+        with AdbShell(device_id, timeout) as shell:
+            def probe():
+                return parse_media_session(shell.run(PROBE_COMMAND))
+
+            for name in commands:
+                send, field = PROBED_COMMANDS[name]
+                samples = []
+                timeouts = 0
+                for _ in range(runs):
+                    latency = measure_once(device_id, probe, send, field, timeout, probe_latency)
+                    if latency is None:
+                        timeouts += 1
+                    else:
+                        samples.append(latency)
+                    time.sleep(settle)
+
+                results[name] = {
+                    "samples_ms": [sample * 1000.0 for sample in samples],
+                    "timeouts": timeouts,
+                    "summary": summarize(samples),
+                }
+    except (OSError, subprocess.SubprocessError) as e:
+        error = f"{type(e).__name__}: {e}"
+        print(f"Error measuring device {device_id}: {error}")
+
+    result = {"probe_round_trip": probe_latency.summary(), "commands": results}
+    if error is not None:
+        result["error"] = error
+    return result
+
+def run_latency_probe(devices: List[Tuple[str, str]], commands: Sequence[str], runs: int,
+                      timeout: float = 5.0, settle: float = 1.0) -> Dict:
+    """
+    Measure every device and collect the results in one report.
+
+    Args:
+        devices: List of (device_id, device_model) tuples
+        commands: Names of commands from PROBED_COMMANDS
+        runs: Number of measurements per command and device
+
+    Returns:
+        Report that can be saved with save_results()
+    """
+    report = {
+        "created": datetime.now().isoformat(timespec="milliseconds"),
+        "runs": runs,
+        "timeout_s": timeout,
+        "settle_s": settle,
+        "devices": {},
+    }
+    for device_id, model in devices:
+        print(f"Measuring {model} ({device_id})...")
+        result = measure_device(device_id, commands, runs, timeout, settle)
+        result["model"] = model
+        report["devices"][device_id] = result
+    return report
+
+def save_results(report: Dict, directory: str = "latency_results") -> str:
+    """
+    Save a report as a timestamped JSON file, so runs can be compared over time.
+
+    An existing file is never overwritten: if two reports have the same
+    timestamp, a counter is appended to the name of the later one.
+
+    Returns:
+        Path of the written file
+    """
+    os.makedirs(directory, exist_ok=True)
+    created = report["created"].replace(":", "").replace("-", "")
+    suffix = ""
+    attempt = 1
+    while True:
+        path = os.path.join(directory, f"latency-{created}{suffix}.json")
+        try:
+            f = open(path, "x")
+        except FileExistsError:
+            attempt += 1
+            suffix = f"-{attempt}"
+            continue
+        with f:
+            json.dump(report, f, indent=2)
+        return path
+
+def print_report(report: Dict) -> None:
+    """Print the latency summary of every device and command."""
+    for device_id, result in report["devices"].items():
+        print(f"\n{result['model']} ({device_id})")
+        if "error" in result:
+            print(f"  failed: {result['error']}")
+        print(f"  probe round trip: {format_summary(result['probe_round_trip'])}")
+        for name, command in result["commands"].items():
+            print(f"  {name}: {format_summary(command['summary'])}, timeouts={command['timeouts']}")